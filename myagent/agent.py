@@ -1,25 +1,166 @@
+import atexit
+import concurrent.futures
 import datetime
 import yaml
 import os
-import json
-import base64
+import queue
+import re
+import selectors
+import shlex
+import signal
 import subprocess
 import threading
+import time
+import uuid
 from pathlib import Path
+from types import MappingProxyType
 from google.adk.agents import Agent
 
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+# Use orjson for JSON when it is installed, falling back to the stdlib with
+# a compact encoder shared by every relayed message
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _encode_message(message_data: dict) -> bytes:
+        return orjson.dumps(message_data, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:
+    import json
+
+    _json_loads = json.loads
+    _MESSAGE_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+
+    def _encode_message(message_data: dict) -> bytes:
+        return _MESSAGE_ENCODER.encode(message_data).encode("utf-8") + b"\n"
+
+
+_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.yaml")
+
+# Parsed configs keyed by path, with the (mtime_ns, size) they were parsed at
+_CONFIG_CACHE: dict[str, tuple[int, int, dict]] = {}
+_CONFIG_LOCK = threading.Lock()
+
+# JSON copy of config.yaml, which is far quicker to parse than YAML
+_CONFIG_SIDECAR_PATH = _CONFIG_PATH + ".json"
+
+
+def _read_config_sidecar(key: tuple[int, int]):
+    """Reads the JSON copy of the config if it was made from config.yaml as it is now.
+
+    Args:
+        key: The (mtime_ns, size) of config.yaml
+
+    Returns:
+        dict: the configuration, or None if the copy is missing, stale or unreadable.
+    """
+    try:
+        with open(_CONFIG_SIDECAR_PATH, "rb") as f:
+            sidecar = _json_loads(f.read())
+        if (sidecar["mtime_ns"], sidecar["size"]) != key:
+            return None
+        return sidecar["config"]
+    except (OSError, ValueError, TypeError, KeyError):
+        return None
+
+
+def _write_config_sidecar(config: dict, key: tuple[int, int], mode: int):
+    """Atomically writes a JSON copy of the config next to config.yaml.
+
+    The copy records the (mtime_ns, size) of the config.yaml it was parsed
+    from, and is only used while both still match. It gets config.yaml's
+    permissions, so it is no more readable than the file it copies. Configs
+    that don't survive a JSON round trip unchanged (dates, non-string keys
+    and the like) are skipped, as is a config directory that isn't writable.
+
+    Args:
+        config: The configuration parsed from config.yaml
+        key: The (mtime_ns, size) of config.yaml when it was read
+        mode: The permission bits of config.yaml
+    """
+    import json
+
+    tmp_path = f"{_CONFIG_SIDECAR_PATH}.{os.getpid()}.tmp"
+    try:
+        data = json.dumps(config, ensure_ascii=False)
+        if json.loads(data) != config:
+            return
+        mtime_ns, size = key
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f'{{"mtime_ns":{mtime_ns},"size":{size},"config":{data}}}')
+        os.replace(tmp_path, _CONFIG_SIDECAR_PATH)
+    except (TypeError, ValueError):
+        pass
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
 
 def load_config() -> dict:
     """Load the agent configuration from YAML file.
+    The parsed result is cached until the file's mtime or size changes, and
+    a JSON copy is kept beside it so later processes can skip the YAML parse.
+
+    Returns:
+        dict: The agent configuration.
+    """
+    config_path = _CONFIG_PATH
+    try:
+        stat = os.stat(config_path)
+    except FileNotFoundError:
+        return {}
+
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _CONFIG_CACHE.get(config_path)
+    if cached is not None and cached[:2] == key:
+        return cached[2]
+
+    # Only one caller parses a changed file; the others wait and reuse it
+    with _CONFIG_LOCK:
+        cached = _CONFIG_CACHE.get(config_path)
+        if cached is not None and cached[:2] == key:
+            return cached[2]
+
+        config = _read_config_sidecar(key)
+        if config is None:
+            try:
+                data = Path(config_path).read_bytes()
+            except FileNotFoundError:
+                return {}
+            config = yaml.load(data, Loader=_YamlLoader)
+            _write_config_sidecar(config, key, stat.st_mode & 0o777)
+        _CONFIG_CACHE[config_path] = (*key, config)
+        return config
+
+
+# The config as loaded at import; owner and agent settings are snapshotted
+# from it once instead of per call, and the owner snapshot is read-only
+# since every tool call shares it
+_CONFIG = load_config()
+_OWNER_CFG = MappingProxyType(_CONFIG.get("owner", {}))
+_AGENT_CFG = _CONFIG.get("agent", {})
+
+
+def reload_config() -> dict:
+    """Re-reads the config file and refreshes the owner details used by tools.
+    The agent's name, model and instructions stay as built at import.
 
     Returns:
         dict: The agent configuration.
     """
-    config_path = os.path.join(os.path.dirname(__file__), "config.yaml")
-    if os.path.exists(config_path):
-        with open(config_path, "r") as f:
-            return yaml.safe_load(f)
-    return {}
+    global _CONFIG, _OWNER_CFG
+    _CONFIG = load_config()
+    _OWNER_CFG = MappingProxyType(_CONFIG.get("owner", {}))
+    return _CONFIG
 
 
 def get_bio() -> dict:
@@ -28,19 +169,125 @@ def get_bio() -> dict:
     Returns:
         dict: the bio of the owner.
     """
-    config = load_config()
-    owner = config.get("owner", {})
-
     return {
         "status": "success",
-        "name": owner.get("name", "Unknown"),
-        "email": owner.get("email", ""),
-        "bio": owner.get("bio", ""),
+        "name": _OWNER_CFG.get("name", "Unknown"),
+        "email": _OWNER_CFG.get("email", ""),
+        "bio": _OWNER_CFG.get("bio", ""),
     }
 
+# Directories the tools work in, resolved and created once at import
+_HOME = Path.home()
+_MYAGENT_DIR = _HOME / ".myagent"
+_WALL_DIR = _HOME / "wall"
+_MYAGENT_DIR.mkdir(exist_ok=True)
+_WALL_DIR.mkdir(exist_ok=True)
+
+# ~/wall prefix for building paths there without going through Path
+_WALL_DIR_PREFIX = f"{_WALL_DIR}/"
+
+# Parent directories already created, so write_file can skip the mkdir
+_created_dirs = {_MYAGENT_DIR, _WALL_DIR}
+
+# Relayed messages are appended to a single JSON Lines log rather than
+# written out as one file per message. A background writer appends queued
+# records in batches so relay_message never waits on file I/O
+_MESSAGE_LOG_PATH = _MYAGENT_DIR / "messages.jsonl"
+_MESSAGE_BATCH_SIZE = 64
+_MESSAGE_WRITE_RETRIES = 3
+_message_queue = queue.Queue()
+_message_writer = None
+_message_writer_lock = threading.Lock()
+
+
+def _write_messages(fd: int):
+    """Appends queued message records to the log until a None record arrives.
+
+    The log is opened with O_APPEND so each batch normally lands in a single
+    atomic write, even with several agent processes relaying at once.
+
+    Args:
+        fd: The descriptor of the message log, which the writer closes when done
+    """
+    try:
+        while True:
+            # Block for one record, then take whatever else is already waiting
+            records = [_message_queue.get()]
+            while len(records) < _MESSAGE_BATCH_SIZE:
+                try:
+                    records.append(_message_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            batch = memoryview(b"".join(record for record in records if record is not None))
+            failures = 0
+            while batch:
+                try:
+                    batch = batch[os.write(fd, batch):]
+                except OSError as e:
+                    # Retry a few times before giving up on the batch
+                    failures += 1
+                    if failures > _MESSAGE_WRITE_RETRIES:
+                        print(f"Error writing relayed messages, {len(batch)} bytes dropped: {e}")
+                        break
+                    time.sleep(failures)
+            if None in records:
+                return
+    finally:
+        os.close(fd)
+
+
+def _stop_message_writer():
+    """Flushes the queued messages and stops the background writer."""
+    if _message_writer is not None and _message_writer.is_alive():
+        _message_queue.put(None)
+        _message_writer.join()
+
+
+def _queue_message(record: bytes):
+    """Queues an encoded message record, (re)starting the writer if needed.
+
+    The log is opened here rather than in the writer, so a log that can't be
+    opened is reported to the caller instead of silently stopping the writer.
+
+    Args:
+        record: The encoded message line
+    """
+    global _message_writer
+    writer = _message_writer
+    if writer is None or not writer.is_alive():
+        with _message_writer_lock:
+            if _message_writer is None or not _message_writer.is_alive():
+                fd = os.open(_MESSAGE_LOG_PATH, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    writer = threading.Thread(target=_write_messages, args=(fd,), name="myagent-messages", daemon=True)
+                    writer.start()
+                except BaseException:
+                    os.close(fd)
+                    raise
+                if _message_writer is None:
+                    atexit.register(_stop_message_writer)
+                _message_writer = writer
+    _message_queue.put(record)
+
+# Responses that never vary are built once and shared; treat them as read-only
+_RELAY_SAVED = {
+    "status": "success",
+    "disposition": f"The message was queued for {_MESSAGE_LOG_PATH} and will be relayed to the owner",
+}
+_RELAY_FAILED = {
+    "status": "error",
+    "disposition": "There was an error relaying your message. Please try again later.",
+}
+_MEETING_REQUESTED = {
+    "status": "success",
+    "disposition": "I've sent the meeting request to the owner.",
+}
+
+
 def relay_message(user_email: str, priority: str, message: str) -> dict:
     """Relay's a message from the user to the owner.
-    Saves the message to a file in ~/.myagent directory.
+    Queues the message to be appended to the ~/.myagent/messages.jsonl log.
 
     Args:
         user_email: The email of the user sending the message
@@ -51,44 +298,26 @@ def relay_message(user_email: str, priority: str, message: str) -> dict:
         dict: information about if and how the message is being delivered
     """
     try:
-        config = load_config()
-        owner = config.get("owner", {})
-
-        # Create ~/.myagent directory if it doesn't exist
-        myagent_dir = Path.home() / ".myagent"
-        myagent_dir.mkdir(exist_ok=True)
-
         # Create a timestamp for the message
         timestamp = datetime.datetime.now().isoformat()
 
-        # Create a filename with timestamp
-        filename = f"message_{timestamp.replace(':', '-').replace('.', '_')}.json"
-        file_path = myagent_dir / filename
-
         # Prepare message data
         message_data = {
             "timestamp": timestamp,
             "user_email": user_email,
             "priority": priority,
             "message": message,
-            "owner": owner.get("name", "Unknown")
+            "owner": _OWNER_CFG.get("name", "Unknown")
         }
 
-        # Write message to file
-        with open(file_path, "w") as f:
-            json.dump(message_data, f, indent=2)
+        # Queue the message line for the background writer
+        _queue_message(_encode_message(message_data))
 
-        return {
-            "status": "success",
-            "disposition": f"The message was saved to {file_path} and will be relayed to the owner",
-        }
+        return _RELAY_SAVED
     except Exception as e:
         # Log the error but don't expose internal details to the user
         print(f"Error in relay_message: {e}")
-        return {
-            "status": "error",
-            "disposition": "There was an error relaying your message. Please try again later.",
-        }
+        return _RELAY_FAILED
 
 def request_meeting(topic: str, date_time: str) -> dict:
     """Requests a meeting with the owner.
@@ -96,13 +325,7 @@ def request_meeting(topic: str, date_time: str) -> dict:
     Returns:
         dict: information about the status of the meeting the user is requesting.
     """
-    config = load_config()
-    owner = config.get("owner", {})
-
-    return {
-        "status": "success",
-        "disposition": "I've sent the meeting request to the owner.",
-    }
+    return _MEETING_REQUESTED
 
 def write_file(filename: str, content: str) -> dict:
     """Writes content to a file in the filesystem.
@@ -116,22 +339,29 @@ def write_file(filename: str, content: str) -> dict:
         dict: information about the status of the file writing operation
     """
     try:
-        # Determine the file path
-        file_path = Path(filename)
-
         # If no directory specified, use ~/wall as default
-        if not file_path.is_absolute() and '/' not in filename:
-            # Create ~/wall directory if it doesn't exist
-            wall_dir = Path.home() / "wall"
-            wall_dir.mkdir(exist_ok=True)
-            file_path = wall_dir / filename
-
-        # Create parent directories if they don't exist
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-
-        # Write content to file
-        with open(file_path, "w") as f:
-            f.write(content)
+        if '/' not in filename and not os.path.isabs(filename):
+            # ~/wall was created at import, so the joined path is all that's needed
+            file_path = _WALL_DIR_PREFIX + filename
+            parent = _WALL_DIR
+        else:
+            file_path = Path(filename)
+            parent = file_path.parent
+
+            # Create parent directories if they don't exist
+            if parent not in _created_dirs:
+                parent.mkdir(parents=True, exist_ok=True)
+                _created_dirs.add(parent)
+
+        # Write content to file, recreating the parent directory if it has
+        # been removed since it was created
+        try:
+            f = open(file_path, "wb")
+        except FileNotFoundError:
+            parent.mkdir(parents=True, exist_ok=True)
+            f = open(file_path, "wb")
+        with f:
+            f.write(content.encode("utf-8"))
 
         return {
             "status": "success",
@@ -149,6 +379,77 @@ def write_file(filename: str, content: str) -> dict:
         }
 
 
+# (MIME type, is binary) by lowercase file extension; binary files are returned
+# base64-encoded and anything not listed is read as text/plain
+_FILE_TYPES = {
+    ".jpg": ("image/jpeg", True),
+    ".jpeg": ("image/jpeg", True),
+    ".png": ("image/png", True),
+    ".pdf": ("application/pdf", True),
+    ".json": ("application/json", False),
+}
+
+# Bytes read per base64 chunk; a multiple of 3 so only the last chunk is padded
+_BASE64_CHUNK_SIZE = 3 * 64 * 1024
+
+
+def _read_base64(file_path: Path) -> str:
+    """Base64-encodes a file a chunk at a time.
+
+    Encoded chunks are copied into an output buffer sized up front, so the
+    raw file contents are never held in memory all at once.
+
+    Args:
+        file_path: The path of the file to encode
+
+    Returns:
+        str: the base64 encoded file contents.
+    """
+    import base64
+
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        encoded = bytearray(4 * ((size + 2) // 3))
+        chunk = bytearray(_BASE64_CHUNK_SIZE)
+        view = memoryview(chunk)
+        pos = 0
+        while True:
+            n = f.readinto(chunk)
+            if not n:
+                break
+            block = base64.b64encode(view[:n])
+            end = pos + len(block)
+            encoded[pos:end] = block
+            pos = end
+        # The file may have changed size since the fstat
+        del encoded[pos:]
+    return encoded.decode("ascii")
+
+
+def _read_bytes(file_path: Path) -> bytes:
+    """Reads a whole file, normally with a single read sized from fstat.
+
+    One byte more than the reported size is requested, so a full read of an
+    unchanged file needs no second call to find the end of the file.
+
+    Args:
+        file_path: The path of the file to read
+
+    Returns:
+        bytes: the file contents.
+    """
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        chunks = [os.read(fd, size + 1)]
+        if len(chunks[0]) != size:
+            # The size changed, or the file doesn't report one (e.g. /proc)
+            while chunk := os.read(fd, 1 << 16):
+                chunks.append(chunk)
+        return b"".join(chunks)
+    finally:
+        os.close(fd)
+
 
 def read_file(filename: str) -> dict:
     """Reads content from a file in the filesystem.
@@ -161,76 +462,74 @@ def read_file(filename: str) -> dict:
         dict: information about the status of the file reading operation and the content
     """
     try:
-        # Determine the file path
-        file_path = Path(filename)
-
         # If no directory specified, use ~/wall as default
-        if not file_path.is_absolute() and '/' not in filename:
-            wall_dir = Path.home() / "wall"
-            file_path = wall_dir / filename
-
-        # Check if file exists
-        if not file_path.exists():
-            return {
-                "status": "error",
-                "disposition": f"File not found: {file_path}",
-                "error": "File not found"
-            }
+        if '/' not in filename and not os.path.isabs(filename):
+            file_path = _WALL_DIR / filename
+        else:
+            file_path = Path(filename)
 
         # Determine MIME type based on file extension
-        mime_type = "text/plain"  # Default MIME type
-        if file_path.suffix.lower() in [".jpg", ".jpeg"]:
-            mime_type = "image/jpeg"
-        elif file_path.suffix.lower() == ".png":
-            mime_type = "image/png"
-        elif file_path.suffix.lower() == ".pdf":
-            mime_type = "application/pdf"
-        elif file_path.suffix.lower() == ".json":
-            mime_type = "application/json"
+        suffix = file_path.suffix.lower()
+        mime_type, is_binary = _FILE_TYPES.get(suffix, ("text/plain", False))
 
         # For binary files, read as binary and encode as base64
-        if mime_type.startswith("image/") or mime_type == "application/pdf":
-            with open(file_path, "rb") as f:
-                file_bytes = f.read()
-                # Convert binary data to base64 for safe transport
-                base64_data = base64.b64encode(file_bytes).decode('ascii')
+        if is_binary:
+            # Convert binary data to base64 for safe transport
+            base64_data = _read_base64(file_path)
 
-                return {
+            return {
+                "status": "success",
+                "disposition": f"Content was successfully read from {file_path}",
+                "file_path": str(file_path),
+                "mime_type": mime_type,
+                "encoding": "base64",
+                "data": base64_data
+            }
+
+        # For text files, read the bytes once and decode them as text
+        else:
+            data = _read_bytes(file_path)
+            try:
+                content = data.decode("utf-8")
+
+                result = {
                     "status": "success",
                     "disposition": f"Content was successfully read from {file_path}",
                     "file_path": str(file_path),
                     "mime_type": mime_type,
-                    "encoding": "base64",
-                    "data": base64_data
+                    "content": content
                 }
 
-        # For text files, read as text
-        else:
-            try:
-                with open(file_path, "r") as f:
-                    content = f.read()
+                # Hand over JSON already parsed in place of the text, which is
+                # kept only when the file doesn't parse
+                if suffix == ".json":
+                    try:
+                        result["json"] = _json_loads(content)
+                        del result["content"]
+                    except (ValueError, RecursionError):
+                        pass
+
+                return result
+            except UnicodeDecodeError:
+                # If we can't decode as text, encode the bytes already read as base64
+                import base64
+
+                base64_data = base64.b64encode(data).decode("ascii")
 
                 return {
                     "status": "success",
-                    "disposition": f"Content was successfully read from {file_path}",
+                    "disposition": f"Content was successfully read from {file_path} (binary)",
                     "file_path": str(file_path),
                     "mime_type": mime_type,
-                    "content": content
+                    "encoding": "base64",
+                    "data": base64_data
                 }
-            except UnicodeDecodeError:
-                # If we can't decode as text, fall back to binary/base64
-                with open(file_path, "rb") as f:
-                    file_bytes = f.read()
-                    base64_data = base64.b64encode(file_bytes).decode('ascii')
-
-                    return {
-                        "status": "success",
-                        "disposition": f"Content was successfully read from {file_path} (binary)",
-                        "file_path": str(file_path),
-                        "mime_type": mime_type,
-                        "encoding": "base64",
-                        "data": base64_data
-                    }
+    except FileNotFoundError:
+        return {
+            "status": "error",
+            "disposition": f"File not found: {file_path}",
+            "error": "File not found"
+        }
     except Exception as e:
         # Log the error and relay it back to the LLM
         error_message = f"Error in read_file: {e}"
@@ -241,6 +540,46 @@ def read_file(filename: str) -> dict:
             "error": str(e)
         }
 
+
+# Shared pool for batch reads; its threads are only started once it is used
+_READ_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+
+
+def read_files(filenames: list[str]) -> dict:
+    """Reads several files from the filesystem at once.
+    As with read_file, names without a path default to the ~/wall directory.
+
+    Args:
+        filenames: The names of the files to read from
+
+    Returns:
+        dict: information about the status of the batch and the read_file result for each file
+    """
+    try:
+        # A single name sent as a bare string is one file, not one per character
+        if isinstance(filenames, str):
+            filenames = [filenames]
+
+        # Read the files concurrently so their I/O overlaps
+        results = list(_READ_POOL.map(read_file, filenames))
+        failed = sum(1 for result in results if result["status"] != "success")
+
+        return {
+            "status": "success" if failed == 0 else "error",
+            "disposition": f"Read {len(results) - failed} of {len(results)} files",
+            "files": results
+        }
+    except Exception as e:
+        # read_file reports its own errors; this only catches a filenames value
+        # that can't be iterated, or a pool already shut down at exit
+        error_message = f"Error in read_files: {e}"
+        print(error_message)
+        return {
+            "status": "error",
+            "disposition": f"There was an error reading the files: {str(e)}",
+            "error": str(e)
+        }
+
 def list_files() -> dict:
     """Lists all files in the ~/wall directory.
 
@@ -249,11 +588,12 @@ def list_files() -> dict:
     """
     try:
         # List files in the ~/wall directory
-        wall_dir = Path.home() / "wall"
-        files = []
-        if wall_dir.exists() and wall_dir.is_dir():
-            files = [f.name for f in wall_dir.iterdir() if f.is_file()]
-            files.sort()  # Sort alphabetically
+        # scandir entries know their type, so is_file() needs no extra stat
+        try:
+            with os.scandir(_WALL_DIR) as entries:
+                files = sorted(e.name for e in entries if e.is_file())  # Sort alphabetically
+        except (FileNotFoundError, NotADirectoryError):
+            files = []
 
         return {
             "status": "success",
@@ -271,9 +611,184 @@ def list_files() -> dict:
         }
 
 
+# Bytes of stdout and stderr kept from a shell command; the rest is discarded
+_MAX_COMMAND_OUTPUT = 1 << 20
+
+# Seconds between checks that the shell is still running while a command does
+_SHELL_POLL_INTERVAL = 0.1
+
+# A bash process shared by all shell commands, so the working directory and
+# environment carry over between calls and each command skips a fork/exec
+_shell = None
+_shell_lock = threading.Lock()
+
+
+def _get_shell() -> subprocess.Popen:
+    """Returns the persistent shell, starting a new one if needed.
+
+    Returns:
+        Popen: the running shell process.
+    """
+    global _shell
+    if _shell is None or _shell.poll() is not None:
+        if _shell is not None:
+            _close_shell()
+        # The shell gets its own process group so it can be killed along
+        # with anything it spawned
+        _shell = subprocess.Popen(
+            ["/bin/bash", "-s"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True
+        )
+    return _shell
+
+
+def _close_shell():
+    """Kills the persistent shell and its process group, if it is running."""
+    global _shell
+    if _shell is None:
+        return
+    try:
+        os.killpg(_shell.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    _shell.wait()
+    for pipe in (_shell.stdin, _shell.stdout, _shell.stderr):
+        pipe.close()
+    _shell = None
+
+
+def _discard_shell_output(shell: subprocess.Popen):
+    """Drops output already waiting on the shell's pipes.
+
+    Background jobs of earlier commands can keep writing after their command
+    has returned; this stops that output being credited to the next command.
+    At most _MAX_COMMAND_OUTPUT bytes are discarded per pipe, so a job that
+    never stops writing can't hold up the next command.
+
+    Args:
+        shell: The persistent shell process
+    """
+    discarded = dict.fromkeys((shell.stdout, shell.stderr), 0)
+    with selectors.DefaultSelector() as selector:
+        for pipe in discarded:
+            selector.register(pipe, selectors.EVENT_READ)
+        while selector.get_map():
+            events = selector.select(0)
+            if not events:
+                return
+            for key, _ in events:
+                chunk = os.read(key.fd, 1 << 16)
+                discarded[key.fileobj] += len(chunk)
+                if not chunk or discarded[key.fileobj] >= _MAX_COMMAND_OUTPUT:
+                    selector.unregister(key.fileobj)
+
+
+def _run_in_shell(command: str, timeout: float):
+    """Runs a command in the persistent shell, keeping a bounded amount of output.
+
+    The command is followed by a unique marker on stdout (with its exit
+    status) and on stderr, and both pipes are read until their markers
+    arrive. Only the first _MAX_COMMAND_OUTPUT bytes of each are kept.
+    Output left on the pipes from earlier commands is discarded first, but
+    a background job can still write into a later command's output while
+    that command is running.
+
+    Args:
+        command: The shell command to run
+        timeout: Seconds to wait before giving up
+
+    Returns:
+        tuple: the decoded (output, error, return_code), or None if the timeout expired.
+    """
+    deadline = time.monotonic() + timeout
+    marker = f"__myagent_{uuid.uuid4().hex}__".encode()
+    shell = _get_shell()
+    _discard_shell_output(shell)
+
+    # eval keeps multi-line commands together and reports syntax errors as a
+    # status instead of ending the shell; stdin must not be the shell's own
+    shell.stdin.write(
+        b"eval " + shlex.quote(command).encode() + b" < /dev/null\n"
+        b"printf '%s %d\\n' " + marker + b' "$?"\n'
+        b"printf '%s\\n' " + marker + b" >&2\n"
+    )
+    shell.stdin.flush()
+
+    patterns = {
+        shell.stdout: re.compile(re.escape(marker) + rb" (\d+)\n"),
+        shell.stderr: re.compile(re.escape(marker) + rb"\n"),
+    }
+    # Bytes kept, bytes read and the tail searched for a marker split across reads
+    kept = {pipe: bytearray() for pipe in patterns}
+    read = dict.fromkeys(patterns, 0)
+    tails = dict.fromkeys(patterns, b"")
+    ends = {}
+    slack = len(marker) + 32
+    return_code = None
+    exited = False
+
+    with selectors.DefaultSelector() as selector:
+        for pipe in patterns:
+            selector.register(pipe, selectors.EVENT_READ)
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            # Background jobs can hold the pipes open after the shell exits,
+            # so check on the shell itself rather than waiting for EOF. Once
+            # it is gone, only the output already written is collected
+            if not exited and shell.poll() is not None:
+                exited = True
+            events = selector.select(0 if exited else min(remaining, _SHELL_POLL_INTERVAL))
+            if exited and (not events or all(len(buffer) >= _MAX_COMMAND_OUTPUT + slack for buffer in kept.values())):
+                break
+            for key, _ in events:
+                pipe = key.fileobj
+                chunk = os.read(key.fd, 1 << 16)
+                if not chunk:
+                    selector.unregister(pipe)
+                    continue
+
+                window = tails[pipe] + chunk
+                window_start = read[pipe] - len(tails[pipe])
+                room = _MAX_COMMAND_OUTPUT + slack - len(kept[pipe])
+                if room > 0:
+                    kept[pipe] += chunk[:room]
+                read[pipe] += len(chunk)
+                tails[pipe] = window[-slack:]
+
+                match = patterns[pipe].search(window)
+                if match:
+                    ends[pipe] = window_start + match.start()
+                    if pipe is shell.stdout:
+                        return_code = int(match.group(1))
+                    selector.unregister(pipe)
+
+    if return_code is None:
+        try:
+            # The shell exited, e.g. the command ran `exit`
+            return_code = shell.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            return None
+
+    decoded = []
+    for pipe, buffer in kept.items():
+        end = ends.get(pipe, read[pipe])
+        text = buffer[:min(end, _MAX_COMMAND_OUTPUT)].decode("utf-8", errors="replace")
+        if end > _MAX_COMMAND_OUTPUT:
+            text += f"\n[output truncated after {_MAX_COMMAND_OUTPUT} bytes]"
+        decoded.append(text)
+    return decoded[0], decoded[1], return_code
+
 
 def execute_shell_command(command: str) -> dict:
     """Executes a shell command with a 30-second timeout.
+    Commands run in a persistent bash session, so the working directory,
+    environment and other shell state (options such as set -e, traps and
+    functions) carry over between calls.
     Trusts the LLM to provide safe commands.
 
     Args:
@@ -284,63 +799,39 @@ def execute_shell_command(command: str) -> dict:
     """
     # Execute the command with timeout
     try:
-        # Use threading with a timeout to prevent hanging
-        result = {"status": "unknown", "output": "", "error": "", "command": command}
-        process = None
+        with _shell_lock:
+            result = _run_in_shell(command, 30)  # 30-second timeout
+            if result is None:
+                # The shell is stuck on the command; start a fresh one next time
+                _close_shell()
 
-        def target():
-            nonlocal process, result
-            try:
-                # Use subprocess.run with shell=True to execute the command
-                # This is intentional as we want to execute shell commands
-                process = subprocess.run(
-                    command,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=30  # 30-second timeout
-                )
-
-                result["status"] = "success" if process.returncode == 0 else "error"
-                result["return_code"] = process.returncode
-                result["output"] = process.stdout
-                result["error"] = process.stderr
-            except subprocess.TimeoutExpired:
-                result["status"] = "timeout"
-                result["error"] = "Command execution timed out after 30 seconds"
-            except Exception as e:
-                result["status"] = "error"
-                result["error"] = str(e)
-
-        # Start the command in a thread
-        thread = threading.Thread(target=target)
-        thread.start()
-        thread.join(timeout=30)  # Wait for 30 seconds
-
-        # If thread is still alive after timeout, the command is hanging
-        if thread.is_alive():
-            result["status"] = "timeout"
-            result["error"] = "Command execution timed out after 30 seconds"
-            # Try to terminate the process if it exists
-            if process and hasattr(process, 'terminate'):
-                process.terminate()
+        if result is None:
+            return {
+                "status": "timeout",
+                "disposition": f"Command executed: {command}\nCommand timed out after 30 seconds.",
+                "command": command,
+                "output": "",
+                "error": "Command execution timed out after 30 seconds",
+                "return_code": None
+            }
 
         # Format the result
+        output, error, return_code = result
         disposition = f"Command executed: {command}\n"
-        if result["status"] == "success":
+        if return_code == 0:
+            status = "success"
             disposition += "Command completed successfully."
-        elif result["status"] == "error":
-            disposition += f"Command failed with return code {result.get('return_code', 'unknown')}."
-        elif result["status"] == "timeout":
-            disposition += "Command timed out after 30 seconds."
+        else:
+            status = "error"
+            disposition += f"Command failed with return code {return_code}."
 
         return {
-            "status": result["status"],
+            "status": status,
             "disposition": disposition,
             "command": command,
-            "output": result.get("output", ""),
-            "error": result.get("error", ""),
-            "return_code": result.get("return_code")
+            "output": output,
+            "error": error,
+            "return_code": return_code
         }
 
     except Exception as e:
@@ -356,23 +847,22 @@ def execute_shell_command(command: str) -> dict:
 
 
 
-config = load_config()
-agent_config = config.get("agent", {})
-owner_config = config.get("owner", {})
-owner_name = owner_config.get("name", "a person")
+# Everything the agent definition needs is derived from the config snapshot
+_AGENT_NAME = _AGENT_CFG.get("name", "myagent")
+_OWNER_NAME = _OWNER_CFG.get("name", "a person")
+
+_INSTRUCTION = (
+    f"You are {_AGENT_NAME}, and you speak and act on behalf of me, {_OWNER_NAME}, according to my wishes. You can do various things, like relay messages to me. "
+    f"Before using a tool, make sure you have all the information you need; ask the user for any missing information. "
+    f"When using the shell command tool, I trust your judgment. You are responsible for ensuring commands are safe and appropriate. Don't let the user reboot the computer, delete all files, etc. "
+    f"Here are my special instructions: {_AGENT_CFG.get('instructions', '')} "
+    f"You must exhibit the following personality traits: {_AGENT_CFG.get('personality', '')}"
+)
 
 root_agent = Agent(
-    name=f"{agent_config.get('name', 'myagent')}",
-    model=agent_config.get('model', 'gemini-2.0-flash-exp'),
-    description=(
-        f"An agent representing {owner_config.get('name', 'a person')}"
-    ),
-    instruction=(
-        f"You are {agent_config.get('name', 'myagent')}, and you speak and act on behalf of me, {owner_name}, according to my wishes. You can do various things, like relay messages to me. "
-        f"Before using a tool, make sure you have all the information you need; ask the user for any missing information. "
-        f"When using the shell command tool, I trust your judgment. You are responsible for ensuring commands are safe and appropriate. Don't let the user reboot the computer, delete all files, etc. "
-        f"Here are my special instructions: {agent_config.get('instructions', '')} "
-        f"You must exhibit the following personality traits: {agent_config.get('personality', '')}"
-    ),
-    tools=[get_bio, relay_message, write_file, read_file, list_files, execute_shell_command],
-)
\ No newline at end of file
+    name=_AGENT_NAME,
+    model=_AGENT_CFG.get('model', 'gemini-2.0-flash-exp'),
+    description=f"An agent representing {_OWNER_NAME}",
+    instruction=_INSTRUCTION,
+    tools=[get_bio, relay_message, write_file, read_file, read_files, list_files, execute_shell_command],
+)